@@ -7,15 +7,27 @@ with AI-powered insights using transformers.
 
 import os
 import json
+import hashlib
+import argparse
 import glob
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 import numpy as np
-from transformers import pipeline
+import pyarrow as pa
+import pyarrow.csv as pv
+import orjson
+import torch
+import ahocorasick
+from transformers import AutoTokenizer, pipeline
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
 from sentence_transformers import SentenceTransformer
-from sklearn.cluster import KMeans
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.cluster import MiniBatchKMeans
 
 # KPI Definitions
 POWER_KPIS = {
@@ -92,6 +104,26 @@ TAX_KPIS = {
 
 ALL_KPIS = {**POWER_KPIS, **TAX_KPIS}
 
+# CSV columns read as text by the pipeline
+CSV_TEXT_COLUMNS = ['article link', 'article headline', 'article text', 'date', 'author', 'summary']
+
+# Key terms surfaced on each article by extract_terms
+TERM_KEYWORDS = ['Nepra', 'FBR', 'IMF', 'GDP', 'IPP', 'Disco', 'CPEC', 'circular debt']
+
+# Model configuration
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+SEMANTIC_MODEL = "sentence-transformers/static-retrieval-mrl-en-v1"  # static embeddings + mean pooling
+HIGH_ACCURACY_SEMANTIC_MODEL = "all-MiniLM-L6-v2"
+
+# On-disk cache for exported/quantized models
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "igc_ai_sample")
+
+# Sentiment labels, in the column order used for per-date counts
+SENTIMENT_LABELS = ['positive', 'negative', 'neutral']
+
+# Mini-batch size for length-sorted ("smart") batching of transformer inputs
+SMART_BATCH_SIZE = 32
+
 # Source credibility scores
 SOURCE_CREDIBILITY = {
     "Dawn": 95,
@@ -105,33 +137,220 @@ SOURCE_CREDIBILITY = {
 class ArticleProcessor:
     """Main processor for article data pipeline"""
 
-    def __init__(self):
+    def __init__(self, high_accuracy: bool = False):
         print("🚀 Initializing Article Processor...")
 
+        # Use the GPU when available
+        self.device = 0 if torch.cuda.is_available() else -1
+        print(f"🖥️  Using device: {'cuda' if self.device == 0 else 'cpu'}")
+
         # Load transformer models
         print("📥 Loading sentiment analysis model...")
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english"
-        )
+        self.sentiment_analyzer = self.load_sentiment_analyzer(SENTIMENT_MODEL)
 
         print("📥 Loading sentence transformer for KPI mapping...")
-        self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Static embeddings are enough for KPI similarity; MiniLM is kept for high-accuracy runs
+        self.high_accuracy = high_accuracy
+        self.semantic_model_name = HIGH_ACCURACY_SEMANTIC_MODEL if high_accuracy else SEMANTIC_MODEL
+        self.semantic_model = SentenceTransformer(
+            self.semantic_model_name,
+            device='cuda' if self.device == 0 else 'cpu'
+        )
+
+        # Pre-compute KPI embeddings (cached on disk across runs)
+        self.kpi_ids = list(ALL_KPIS.keys())
+        self.kpi_index = {kpi_id: i for i, kpi_id in enumerate(self.kpi_ids)}
+        kpi_embeddings = self.load_kpi_embeddings()
+
+        # KPI embeddings are unit-norm, so cosine similarity is a plain dot product
+        self.kpi_matrix = kpi_embeddings.astype(np.float32, copy=False)
 
-        # Pre-compute KPI embeddings
-        self.kpi_embeddings = {}
+        # KPI subsets per article category, specialized once instead of per article
+        self.category_kpi_ids = {'power': list(POWER_KPIS), 'tax': list(TAX_KPIS)}
+        self.category_kpi_cols = {
+            category: np.array([self.kpi_index[kpi_id] for kpi_id in kpi_ids])
+            for category, kpi_ids in self.category_kpi_ids.items()
+        }
+        self.kpi_keyword_counts = {kpi_id: len(kpi_data['keywords']) for kpi_id, kpi_data in ALL_KPIS.items()}
+
+        # Half-precision copy for tensor-core matmuls on GPU
+        if self.device == 0:
+            self.kpi_matrix_fp16 = torch.from_numpy(self.kpi_matrix).to('cuda', dtype=torch.float16)
+
+        # Single Aho-Corasick automaton over all KPI keywords
+        self.keyword_kpis = {}
         for kpi_id, kpi_data in ALL_KPIS.items():
-            kpi_text = f"{kpi_data['name']} {kpi_data['description']} {' '.join(kpi_data['keywords'])}"
-            self.kpi_embeddings[kpi_id] = self.semantic_model.encode(kpi_text)
+            for keyword in kpi_data['keywords']:
+                self.keyword_kpis.setdefault(keyword.lower(), []).append(kpi_id)
+
+        self.keyword_automaton = ahocorasick.Automaton()
+        for keyword in self.keyword_kpis:
+            self.keyword_automaton.add_word(keyword, keyword)
+        self.keyword_automaton.make_automaton()
 
         print("✅ Models loaded successfully!\n")
 
+    def load_sentiment_analyzer(self, model_name: str):
+        """Load the sentiment pipeline: INT8-quantized ONNX Runtime on CPU, the PyTorch model on GPU"""
+        # INT8 ONNX Runtime only pays off on CPU; on GPU run the PyTorch model directly
+        if self.device == 0:
+            return pipeline("sentiment-analysis", model=model_name, device=self.device)
+
+        quantized_dir = os.path.join(CACHE_DIR, f"{model_name.replace('/', '--')}-onnx-int8")
+
+        # Export and quantize once, then reuse the cached model on later runs
+        cache_complete = all(
+            os.path.exists(os.path.join(quantized_dir, name))
+            for name in ("model_quantized.onnx", "tokenizer_config.json")
+        )
+        if not cache_complete:
+            print("  Exporting sentiment model to ONNX and quantizing to INT8...")
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            shutil.rmtree(quantized_dir, ignore_errors=True)
+
+            # Build in a temp dir and move it into place only once it is complete
+            build_dir = tempfile.mkdtemp(dir=CACHE_DIR)
+            try:
+                onnx_model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+                quantizer = ORTQuantizer.from_pretrained(onnx_model)
+                quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=build_dir, quantization_config=quantization_config)
+                AutoTokenizer.from_pretrained(model_name).save_pretrained(build_dir)
+                os.replace(build_dir, quantized_dir)
+            finally:
+                shutil.rmtree(build_dir, ignore_errors=True)
+
+        ort_model = ORTModelForSequenceClassification.from_pretrained(
+            quantized_dir,
+            file_name="model_quantized.onnx"
+        )
+        tokenizer = AutoTokenizer.from_pretrained(quantized_dir)
+
+        return pipeline("sentiment-analysis", model=ort_model, tokenizer=tokenizer)
+
+    def load_kpi_embeddings(self) -> np.ndarray:
+        """Encode normalized KPI descriptions (one row per KPI), reusing a cached copy when available"""
+        # Keyed by model name and KPI definitions (in order) so any change re-encodes
+        cache_key = hashlib.md5(
+            json.dumps([self.semantic_model_name, 'normalized', ALL_KPIS]).encode()
+        ).hexdigest()
+        cache_path = os.path.join(CACHE_DIR, f"kpi_emb_{cache_key}.npy")
+
+        if os.path.exists(cache_path):
+            print("  Using cached KPI embeddings")
+            return np.load(cache_path)
+
+        kpi_texts = [
+            f"{kpi_data['name']} {kpi_data['description']} {' '.join(kpi_data['keywords'])}"
+            for kpi_data in ALL_KPIS.values()
+        ]
+        with torch.inference_mode():
+            embeddings = self.semantic_model.encode(kpi_texts, convert_to_numpy=True, normalize_embeddings=True)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.save(cache_path, embeddings)
+        return embeddings
+
     def safe_mean(self, values):
         """Calculate mean while filtering out NaN and None values"""
-        filtered = [v for v in values if v is not None and not (isinstance(v, float) and np.isnan(v))]
-        if not filtered:
+        values = np.asarray(values, dtype=float)  # None becomes NaN
+        filtered = values[~np.isnan(values)]
+        if filtered.size == 0:
             return 0.0
-        return np.mean(filtered)
+        return float(np.mean(filtered))
+
+    def smart_batch_order(self, texts: List[str], tokenizer) -> Tuple[np.ndarray, np.ndarray]:
+        """Order texts by token length so each mini-batch pads only to its own max"""
+        lengths = [len(tokenizer.tokenize(text)) for text in texts]
+        order = np.argsort(lengths, kind='stable')
+
+        # Inverse permutation to restore the original order after inference
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        return order, inverse
+
+    def encode_texts(self, texts: List[str], batch_size: int = SMART_BATCH_SIZE,
+                     normalize: bool = False) -> np.ndarray:
+        """Encode texts with the semantic model using length-sorted mini-batches"""
+        if not texts:
+            return np.empty((0, self.semantic_model.get_sentence_embedding_dimension()))
+
+        with torch.inference_mode():
+            # Static embedding models have no padding cost, so encode in one call
+            if not self.high_accuracy:
+                return self.semantic_model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize
+                )
+
+            order, inverse = self.smart_batch_order(texts, self.semantic_model.tokenizer)
+            sorted_texts = [texts[i] for i in order]
+
+            batches = []
+            for start in range(0, len(sorted_texts), batch_size):
+                batch = sorted_texts[start:start + batch_size]
+                batches.append(self.semantic_model.encode(
+                    batch,
+                    batch_size=len(batch),
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize
+                ))
+
+        return np.vstack(batches)[inverse]
+
+    def kpi_similarity_matrix(self, article_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of normalized article embeddings against every KPI (articles x KPIs)"""
+        if self.device == 0:
+            # FP16 halves the bytes moved; only the small result is upcast to fp32
+            article_matrix = torch.from_numpy(article_embeddings).to('cuda', dtype=torch.float16)
+            with torch.inference_mode():
+                similarities = torch.matmul(article_matrix, self.kpi_matrix_fp16.T)
+            return similarities.float().cpu().numpy()
+
+        # NumPy has no BLAS kernel for fp16, so stay in fp32 on CPU
+        return np.matmul(article_embeddings.astype(np.float32, copy=False), self.kpi_matrix.T)
+
+    def match_keywords(self, text_lower: str) -> set:
+        """Return the set of (lowercased) keywords found in text in a single pass"""
+        return {keyword for _, keyword in self.keyword_automaton.iter(text_lower)}
+
+    def read_csv_file(self, csv_file: str) -> Optional[pa.Table]:
+        """Load a single CSV file as an Arrow table tagged with source/date/category from its path"""
+        try:
+            # Extract metadata from file path
+            # e.g., data/postprocessed/dawn/2026-01-21/power_2026-01-21_processed_summarized.csv
+            parts = csv_file.split(os.sep)
+            source = parts[-3]  # dawn or brecorder
+            date = parts[-2]    # 2026-01-21
+            filename = parts[-1]
+            category = "power" if filename.startswith("power") else "tax"
+
+            # Article text contains quoted line breaks; text columns are pinned to strings so
+            # per-file type inference can't disagree, and empty cells stay null as with pd.read_csv
+            table = pv.read_csv(
+                csv_file,
+                parse_options=pv.ParseOptions(newlines_in_values=True),
+                convert_options=pv.ConvertOptions(
+                    column_types={column: pa.string() for column in CSV_TEXT_COLUMNS},
+                    strings_can_be_null=True
+                )
+            )
+            if 'date' in table.column_names:
+                table = table.drop_columns(['date'])
+
+            num_rows = table.num_rows
+            table = table.append_column('source', pa.array([source] * num_rows, pa.string()))
+            table = table.append_column('date', pa.array([date] * num_rows, pa.string()))
+            table = table.append_column('category', pa.array([category] * num_rows, pa.string()))
+
+            print(f"  ✓ Loaded {num_rows} articles from {source}/{date}/{category}")
+            return table
+
+        except Exception as e:
+            print(f"  ✗ Error loading {csv_file}: {e}")
+            return None
 
     def load_csv_files(self, data_dir: str) -> pd.DataFrame:
         """Load all CSV files from data directory"""
@@ -140,88 +359,82 @@ class ArticleProcessor:
         csv_files = glob.glob(f"{data_dir}/**/**.csv", recursive=True)
         print(f"Found {len(csv_files)} CSV files")
 
-        all_data = []
-        for csv_file in csv_files:
-            try:
-                # Extract metadata from file path
-                # e.g., data/postprocessed/dawn/2026-01-21/power_2026-01-21_processed_summarized.csv
-                parts = csv_file.split(os.sep)
-                source = parts[-3]  # dawn or brecorder
-                date = parts[-2]    # 2026-01-21
-                filename = parts[-1]
-                category = "power" if filename.startswith("power") else "tax"
-
-                df = pd.read_csv(csv_file)
-                df['source'] = source
-                df['date'] = date
-                df['category'] = category
-
-                all_data.append(df)
-                print(f"  ✓ Loaded {len(df)} articles from {source}/{date}/{category}")
-
-            except Exception as e:
-                print(f"  ✗ Error loading {csv_file}: {e}")
-
-        combined_df = pd.concat(all_data, ignore_index=True)
+        # Files are independent, so read them concurrently
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            tables = [table for table in executor.map(self.read_csv_file, csv_files) if table is not None]
+
+        # Concatenate Arrow column chunks without copying, then convert to pandas once,
+        # releasing Arrow buffers as columns are converted
+        # Permissive promotion upcasts mismatched inferred types (e.g. int64 vs double)
+        combined_table = pa.concat_tables(tables, promote_options="permissive")
+        del tables
+        combined_df = combined_table.to_pandas(split_blocks=True, self_destruct=True)
+        del combined_table
         print(f"\n📊 Total articles loaded: {len(combined_df)}\n")
 
         return combined_df
 
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        """Analyze sentiment of text using transformers"""
+    def analyze_sentiment(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Analyze sentiment of a batch of texts using transformers"""
         try:
-            # Truncate to 512 tokens for BERT
-            truncated_text = text[:512]
-            result = self.sentiment_analyzer(truncated_text)[0]
-
-            # Convert to our sentiment scale
-            label = result['label'].lower()
-            score = result['score']
+            # Truncate to 512 chars for BERT and run a single batched pipeline call
+            # over length-sorted inputs, then restore the original order
+            truncated_texts = [text[:512] for text in texts]
+            order, inverse = self.smart_batch_order(truncated_texts, self.sentiment_analyzer.tokenizer)
+            with torch.inference_mode():
+                sorted_results = self.sentiment_analyzer(
+                    [truncated_texts[i] for i in order],
+                    batch_size=SMART_BATCH_SIZE,
+                    truncation=True
+                )
+            results = [sorted_results[i] for i in inverse]
+        except Exception as e:
+            print(f"  ⚠️  Sentiment analysis error: {e}")
+            return {
+                'sentiment': np.full(len(texts), 'neutral', dtype=object),
+                'sentimentScore': np.zeros(len(texts))
+            }
 
-            if label == 'positive':
-                sentiment_score = score
-                sentiment = 'positive'
-            else:  # negative
-                sentiment_score = -score
-                sentiment = 'negative'
+        labels = np.array([result['label'] for result in results])
+        probs = np.array([result['score'] for result in results], dtype=float)
 
-            # Neutral threshold
-            if abs(sentiment_score) < 0.3:
-                sentiment = 'neutral'
+        # Convert to our sentiment scale, with a neutral threshold
+        scores = np.where(labels == 'POSITIVE', probs, -probs)
+        sentiment = np.where(
+            np.abs(scores) < 0.3,
+            'neutral',
+            np.where(scores > 0, 'positive', 'negative')
+        ).astype(object)
 
-            return {
-                'sentiment': sentiment,
-                'sentimentScore': sentiment_score
-            }
-        except Exception as e:
-            print(f"  ⚠️  Sentiment analysis error: {e}")
-            return {'sentiment': 'neutral', 'sentimentScore': 0.0}
+        return {
+            'sentiment': sentiment,
+            'sentimentScore': scores
+        }
 
-    def extract_kpi_relevance(self, text: str, category: str) -> Dict[str, float]:
+    def extract_kpi_relevance(self, text_lower: str, category: str, kpi_similarities: np.ndarray) -> Dict[str, float]:
         """Extract KPI relevance scores using keyword + semantic matching"""
         relevance_scores = {}
-        text_lower = text.lower()
+        matched_keywords = self.match_keywords(text_lower)
+
+        # Number of distinct keywords matched per KPI
+        keyword_hits = Counter(
+            kpi_id
+            for keyword in matched_keywords
+            for kpi_id in self.keyword_kpis.get(keyword, [])
+        )
 
-        # Get article embedding
-        article_embedding = self.semantic_model.encode(text)
+        # KPIs for this category (resolved once at init)
+        if category not in self.category_kpi_ids:
+            return relevance_scores
 
-        # Filter KPIs by category
-        relevant_kpis = {k: v for k, v in ALL_KPIS.items()
-                        if (category == 'power' and k in POWER_KPIS) or
-                           (category == 'tax' and k in TAX_KPIS)}
+        # Semantic similarities for the category's KPIs (precomputed row of the article x KPI matrix)
+        category_similarities = kpi_similarities[self.category_kpi_cols[category]].tolist()
 
-        for kpi_id, kpi_data in relevant_kpis.items():
+        for kpi_id, semantic_sim in zip(self.category_kpi_ids[category], category_similarities):
             # Keyword matching score
-            keyword_matches = sum(1 for keyword in kpi_data['keywords']
-                                if keyword.lower() in text_lower)
-            keyword_score = min(keyword_matches / len(kpi_data['keywords']), 1.0) * 100
+            keyword_score = min(keyword_hits[kpi_id] / self.kpi_keyword_counts[kpi_id], 1.0) * 100
 
             # Semantic similarity score
-            kpi_embedding = self.kpi_embeddings[kpi_id]
-            semantic_sim = cosine_similarity(
-                article_embedding.reshape(1, -1),
-                kpi_embedding.reshape(1, -1)
-            )[0][0]
             semantic_score = max(0, semantic_sim) * 100
 
             # Combined score (60% semantic, 40% keyword)
@@ -230,89 +443,99 @@ class ArticleProcessor:
 
         return relevance_scores
 
-    def extract_terms(self, text: str) -> List[str]:
-        """Extract key terms from text (simplified)"""
+    def extract_terms(self, summaries_lower: pd.Series) -> List[List[str]]:
+        """Extract key terms from lowercased summaries (simplified)"""
         # Simple extraction - in production, use NER
-        terms = []
-        keywords = ['Nepra', 'FBR', 'IMF', 'GDP', 'IPP', 'Disco', 'CPEC', 'circular debt']
-        text_lower = text.lower()
-
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                terms.append(keyword)
-
-        return terms
-
-    def process_articles(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """Process all articles with AI features"""
+        # Articles x terms presence matrix, one vectorized scan per term
+        hits = np.stack([
+            summaries_lower.str.contains(term.lower(), regex=False).to_numpy(dtype=bool)
+            for term in TERM_KEYWORDS
+        ], axis=1)
+        return [[TERM_KEYWORDS[i] for i in np.flatnonzero(row)] for row in hits]
+
+    def process_articles(self, df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Process all articles with AI features; also returns the normalized summary embeddings"""
         print("🤖 Processing articles with AI models...\n")
 
-        articles = []
-        for idx, row in df.iterrows():
-            if idx % 50 == 0:
-                print(f"  Processed {idx}/{len(df)} articles...")
+        # Sentiment analysis (batched over all summaries)
+        print("  Running batched sentiment analysis...")
+        sentiment_data = self.analyze_sentiment(df['summary'].tolist())
 
-            # Get source name (capitalize)
-            source = row['source'].title()
-            if source == 'Brecorder':
-                source = 'Business Recorder'
+        # Article embeddings for KPI relevance and topic clustering (single batched encode)
+        print("  Encoding article summaries...")
+        article_embeddings = self.encode_texts(df['summary'].tolist(), normalize=True)
 
-            # Sentiment analysis
-            sentiment_data = self.analyze_sentiment(row['summary'])
+        # Cosine similarity of every article against every KPI in one matmul
+        similarity_matrix = self.kpi_similarity_matrix(article_embeddings)
 
-            # KPI relevance
-            kpi_relevance = self.extract_kpi_relevance(
-                row['summary'],
-                row['category']
-            )
+        # KPI relevance (keyword matching is per text) and key terms (vectorized over the column)
+        print("  Scoring KPI relevance and extracting terms...")
+        summaries_lower = df['summary'].str.lower()
+        kpi_relevance = [
+            self.extract_kpi_relevance(summary_lower, category, similarities)
+            for summary_lower, category, similarities in zip(summaries_lower, df['category'], similarity_matrix)
+        ]
+        extracted_terms = self.extract_terms(summaries_lower)
 
-            # Extract terms
-            extracted_terms = self.extract_terms(row['summary'])
-
-            # Get KPI IDs (relevance > 30)
-            kpi_ids = [kpi_id for kpi_id, score in kpi_relevance.items() if score > 30]
-
-            article = {
-                'id': f"{row['source']}-{row['date']}-{row['category']}-{idx}",
-                'title': row['article headline'],
-                'source': source,
-                'category': row['category'],
-                'publishedAt': f"{row['date']}T00:00:00Z",
-                'summary': row['summary'],
-                'fullText': row['article text'],
-                'url': row['article link'],
-                'author': row.get('author', ''),
-                'sentiment': sentiment_data['sentiment'],
-                'sentimentScore': sentiment_data['sentimentScore'],
-                'kpiRelevance': kpi_relevance,
-                'kpiIds': kpi_ids,
-                'extractedTerms': extracted_terms,
-                'credibilityScore': SOURCE_CREDIBILITY.get(source, 85)
-            }
+        # Get KPI IDs (relevance > 30)
+        kpi_ids = [
+            [kpi_id for kpi_id, score in relevance.items() if score > 30]
+            for relevance in kpi_relevance
+        ]
 
-            articles.append(article)
+        # Column-wise article fields
+        source_display = df['source'].str.title().replace({'Brecorder': 'Business Recorder'})
+        credibility_scores = source_display.map(SOURCE_CREDIBILITY).fillna(85).astype(int).tolist()
+
+        records = pd.DataFrame({
+            'id': df['source'] + '-' + df['date'] + '-' + df['category'] + '-' + df.index.astype(str),
+            'title': df['article headline'],
+            'source': source_display,
+            'category': df['category'],
+            'publishedAt': df['date'] + 'T00:00:00Z',
+            'summary': df['summary'],
+            'fullText': df['article text'],
+            'url': df['article link'],
+            'author': df['author'] if 'author' in df else ''
+        }).to_dict('records')
+
+        articles = [
+            {
+                **record,
+                'sentiment': sentiment,
+                'sentimentScore': sentiment_score,
+                'kpiRelevance': relevance,
+                'kpiIds': ids,
+                'extractedTerms': terms,
+                'credibilityScore': credibility
+            }
+            for record, sentiment, sentiment_score, relevance, ids, terms, credibility in zip(
+                records,
+                sentiment_data['sentiment'].tolist(),
+                sentiment_data['sentimentScore'].tolist(),
+                kpi_relevance,
+                kpi_ids,
+                extracted_terms,
+                credibility_scores
+            )
+        ]
 
         print(f"\n✅ Processed {len(articles)} articles\n")
-        return articles
+        return articles, article_embeddings
 
-    def perform_topic_clustering(self, articles: List[Dict]) -> List[Dict]:
-        """Perform topic clustering on articles"""
+    def perform_topic_clustering(self, articles: List[Dict], embeddings: np.ndarray) -> List[Dict]:
+        """Perform topic clustering on articles using their precomputed summary embeddings"""
         print("🎯 Performing topic clustering...")
 
-        # Get article summaries
-        summaries = [a['summary'] for a in articles]
-
-        # Generate embeddings
-        print("  Encoding article summaries...")
-        embeddings = self.semantic_model.encode(summaries, show_progress_bar=True)
+        # Embeddings are unit norm (from process_articles) -> spherical clustering
 
-        # K-means clustering
+        # Mini-batch K-means clustering
         n_clusters = min(10, len(articles) // 50)  # At least 50 articles per cluster
         if n_clusters < 2:
             n_clusters = 2
 
         print(f"  Clustering into {n_clusters} topics...")
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=1024, n_init=3)
         cluster_labels = kmeans.fit_predict(embeddings)
 
         # Add cluster labels to articles
@@ -322,46 +545,72 @@ class ArticleProcessor:
         print(f"✅ Clustered articles into {n_clusters} topics\n")
         return articles
 
-    def generate_kpis(self, articles: List[Dict]) -> List[Dict]:
+    def index_articles(self, articles: List[Dict]) -> Dict[str, np.ndarray]:
+        """Build per-article arrays and date groups shared by KPI, trend and anomaly generation"""
+        published = np.array([a['publishedAt'] for a in articles])
+
+        # Sorted unique dates and, for every article, the index of its date
+        dates, date_idx = np.unique(published.astype('U10'), return_inverse=True)
+
+        return {
+            'published': published,
+            'dates': dates,
+            'date_idx': date_idx,
+            # Stable sort so articles published on the same day keep their original order
+            'date_order': np.argsort(published, kind='stable'),
+            'sentiment_idx': np.array([SENTIMENT_LABELS.index(a['sentiment']) for a in articles], dtype=int),
+            'sentiment_scores': np.array([a['sentimentScore'] for a in articles], dtype=float),
+            # Articles x KPIs relevance matrix
+            'relevance': np.array(
+                [[a['kpiRelevance'].get(kpi_id, 0) for kpi_id in self.kpi_ids] for a in articles],
+                dtype=float
+            ).reshape(len(articles), len(self.kpi_ids))
+        }
+
+    def generate_kpis(self, article_index: Dict[str, np.ndarray]) -> List[Dict]:
         """Generate KPI metadata with scores"""
         print("📈 Generating KPI metadata...")
 
         kpis = []
 
-        for kpi_id, kpi_data in ALL_KPIS.items():
-            # Filter relevant articles (relevance > 30)
-            relevant_articles = [
-                a for a in articles
-                if kpi_id in a['kpiRelevance'] and a['kpiRelevance'][kpi_id] > 30
-            ]
+        published = article_index['published']
+        date_order = article_index['date_order']
+        relevance = article_index['relevance']
+        sentiment_scores = article_index['sentiment_scores']
+        weighted_scores = ((sentiment_scores[:, None] + 1) / 2) * (relevance / 100) * 100  # 0-100 scale
+
+        # Historical data by date for every KPI in one grouped pass over relevant (article, KPI) pairs
+        article_idx, kpi_idx = np.nonzero(relevance > 30)
+        history = pd.DataFrame({
+            'kpi': kpi_idx,
+            'date_idx': article_index['date_idx'][article_idx],
+            'score': weighted_scores[article_idx, kpi_idx]
+        })
+        history = history.groupby(['kpi', 'date_idx'])['score'].agg(['mean', 'count']).reset_index()
+        history['date'] = article_index['dates'][history['date_idx'].to_numpy(dtype=int)].tolist()
+        history['score'] = history['mean'].round(2)
+        history = history.rename(columns={'count': 'articleCount'})
+        history_by_kpi = {
+            col: group[['date', 'score', 'articleCount']].to_dict('records')
+            for col, group in history.groupby('kpi')
+        }
+
+        for col, kpi_id in enumerate(self.kpi_ids):
+            kpi_data = ALL_KPIS[kpi_id]
 
-            if not relevant_articles:
+            # Relevant articles (relevance > 30), in publication order
+            relevant = date_order[relevance[date_order, col] > 30]
+
+            if relevant.size == 0:
                 continue
 
             # Calculate current score (avg sentiment * relevance)
-            scores = []
-            for article in relevant_articles:
-                sentiment_score = article['sentimentScore']
-                relevance = article['kpiRelevance'][kpi_id] / 100
-                weighted_score = ((sentiment_score + 1) / 2) * relevance * 100  # 0-100 scale
-                scores.append(weighted_score)
-
-            current_score = self.safe_mean(scores) if scores else 50
+            scores = weighted_scores[relevant, col]
+            current_score = self.safe_mean(scores)
 
             # Calculate trend (compare recent vs older articles)
-            sorted_articles = sorted(relevant_articles, key=lambda x: x['publishedAt'])
-            mid_point = len(sorted_articles) // 2
-
-            if len(sorted_articles) > 5:
-                older_scores = [
-                    ((a['sentimentScore'] + 1) / 2) * (a['kpiRelevance'][kpi_id] / 100) * 100
-                    for a in sorted_articles[:mid_point]
-                ]
-                recent_scores = [
-                    ((a['sentimentScore'] + 1) / 2) * (a['kpiRelevance'][kpi_id] / 100) * 100
-                    for a in sorted_articles[mid_point:]
-                ]
-                previous_score = self.safe_mean(older_scores)
+            if relevant.size > 5:
+                previous_score = self.safe_mean(scores[:relevant.size // 2])
 
                 if current_score > previous_score + 5:
                     trend = "up"
@@ -373,25 +622,6 @@ class ArticleProcessor:
                 previous_score = current_score
                 trend = "stable"
 
-            # Historical data by date
-            historical_data = {}
-            for article in relevant_articles:
-                date = article['publishedAt'][:10]
-                if date not in historical_data:
-                    historical_data[date] = []
-
-                score = ((article['sentimentScore'] + 1) / 2) * (article['kpiRelevance'][kpi_id] / 100) * 100
-                historical_data[date].append(score)
-
-            historical = [
-                {
-                    'date': date,
-                    'score': round(self.safe_mean(scores), 2),
-                    'articleCount': len(scores)
-                }
-                for date, scores in sorted(historical_data.items())
-            ]
-
             kpi = {
                 'id': kpi_id,
                 'name': kpi_data['name'],
@@ -401,9 +631,9 @@ class ArticleProcessor:
                 'currentScore': round(current_score, 2),
                 'previousScore': round(previous_score, 2),
                 'trend': trend,
-                'articleCount': len(relevant_articles),
-                'lastUpdated': max(a['publishedAt'] for a in relevant_articles),
-                'historicalData': historical
+                'articleCount': int(relevant.size),
+                'lastUpdated': str(published[relevant[-1]]),
+                'historicalData': history_by_kpi[col]
             }
 
             kpis.append(kpi)
@@ -411,27 +641,20 @@ class ArticleProcessor:
         print(f"✅ Generated {len(kpis)} KPIs\n")
         return kpis
 
-    def generate_trends(self, articles: List[Dict]) -> Dict[str, Any]:
+    def generate_trends(self, article_index: Dict[str, np.ndarray]) -> Dict[str, Any]:
         """Generate trend data for charts"""
         print("📊 Generating trend data...")
 
-        # Group by date
-        by_date = {}
-        for article in articles:
-            date = article['publishedAt'][:10]
-            if date not in by_date:
-                by_date[date] = {'positive': 0, 'negative': 0, 'neutral': 0}
-
-            by_date[date][article['sentiment']] += 1
+        # Sentiment counts per date (dates x sentiment labels)
+        counts = np.zeros((len(article_index['dates']), len(SENTIMENT_LABELS)), dtype=int)
+        np.add.at(counts, (article_index['date_idx'], article_index['sentiment_idx']), 1)
 
         sentiment_trends = [
             {
                 'date': date,
-                'positive': counts['positive'],
-                'negative': counts['negative'],
-                'neutral': counts['neutral']
+                **dict(zip(SENTIMENT_LABELS, date_counts))
             }
-            for date, counts in sorted(by_date.items())
+            for date, date_counts in zip(article_index['dates'].tolist(), counts.tolist())
         ]
 
         print(f"✅ Generated trends for {len(sentiment_trends)} dates\n")
@@ -440,30 +663,25 @@ class ArticleProcessor:
             'sentimentTrends': sentiment_trends
         }
 
-    def detect_anomalies(self, articles: List[Dict], kpis: List[Dict]) -> List[Dict]:
+    def detect_anomalies(self, article_index: Dict[str, np.ndarray], kpis: List[Dict]) -> List[Dict]:
         """Detect anomalies and generate alerts"""
         print("🚨 Detecting anomalies and generating alerts...")
 
         alerts = []
 
-        # Group articles by date
-        by_date = {}
-        for article in articles:
-            date = article['publishedAt'][:10]
-            if date not in by_date:
-                by_date[date] = []
-            by_date[date].append(article)
-
-        dates = sorted(by_date.keys())
+        published = article_index['published']
+        date_order = article_index['date_order']
+        relevance = article_index['relevance']
+        negative_idx = SENTIMENT_LABELS.index('negative')
 
         # Article volume spike detection
-        daily_counts = [len(by_date[date]) for date in dates]
+        dates = article_index['dates'].tolist()
+        daily_counts = np.bincount(article_index['date_idx'], minlength=len(dates))
         if len(daily_counts) > 3:
             mean_count = self.safe_mean(daily_counts)
             std_count = np.std(daily_counts)
 
-            for date in dates[-3:]:  # Check last 3 days
-                count = len(by_date[date])
+            for date, count in zip(dates[-3:], daily_counts[-3:].tolist()):  # Check last 3 days
                 if count > mean_count + 2 * std_count:
                     alerts.append({
                         'id': f'alert-spike-{date}',
@@ -490,11 +708,11 @@ class ArticleProcessor:
                     'source': 'KPI Monitoring'
                 })
 
-            # Negative sentiment surge
-            kpi_articles = [a for a in articles if kpi['id'] in a['kpiIds']]
-            if len(kpi_articles) > 10:
-                recent_kpi_articles = sorted(kpi_articles, key=lambda x: x['publishedAt'])[-7:]
-                negative_pct = sum(1 for a in recent_kpi_articles if a['sentiment'] == 'negative') / len(recent_kpi_articles)
+            # Negative sentiment surge (KPI articles are those with relevance > 30, in publication order)
+            kpi_articles = date_order[relevance[date_order, self.kpi_index[kpi['id']]] > 30]
+            if kpi_articles.size > 10:
+                recent_kpi_articles = kpi_articles[-7:]
+                negative_pct = float(np.mean(article_index['sentiment_idx'][recent_kpi_articles] == negative_idx))
 
                 if negative_pct > 0.7:
                     alerts.append({
@@ -504,7 +722,7 @@ class ArticleProcessor:
                         'severity': 'warning',
                         'status': 'new',
                         'kpiId': kpi['id'],
-                        'createdAt': recent_kpi_articles[-1]['publishedAt'],
+                        'createdAt': str(published[recent_kpi_articles[-1]]),
                         'source': 'Sentiment Analysis'
                     })
 
@@ -561,7 +779,6 @@ class ArticleProcessor:
                 for a in cluster_articles:
                     all_terms.extend(a.get('extractedTerms', []))
 
-                from collections import Counter
                 common_terms = Counter(all_terms).most_common(3)
                 term_str = ', '.join([t[0] for t in common_terms]) if common_terms else 'various topics'
 
@@ -594,29 +811,13 @@ class ArticleProcessor:
         print(f"✅ Generated {len(insights)} insights\n")
         return insights
 
-    def convert_to_native_types(self, obj):
-        """Convert numpy types to Python native types for JSON serialization"""
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            # Convert NaN and Inf to None (null in JSON)
-            val = float(obj)
-            if np.isnan(val) or np.isinf(val):
-                return None
-            return val
-        elif isinstance(obj, float):
-            # Handle regular Python floats that might be NaN or Inf
-            if np.isnan(obj) or np.isinf(obj):
-                return None
-            return obj
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, dict):
-            return {key: self.convert_to_native_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self.convert_to_native_types(item) for item in obj]
-        else:
-            return obj
+    def write_json(self, path: str, data: Any):
+        """Serialize data to a JSON file with orjson (numpy values and NaN/Inf -> null handled natively)"""
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(
+                data,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
 
     def save_outputs(self, output_dir: str, articles: List, kpis: List, trends: Dict, insights: List, alerts: List):
         """Save all processed data to JSON files"""
@@ -624,31 +825,20 @@ class ArticleProcessor:
 
         os.makedirs(output_dir, exist_ok=True)
 
-        # Convert all data to native types
-        articles = self.convert_to_native_types(articles)
-        kpis = self.convert_to_native_types(kpis)
-        trends = self.convert_to_native_types(trends)
-        insights = self.convert_to_native_types(insights)
-        alerts = self.convert_to_native_types(alerts)
-
         # Save articles
-        with open(f"{output_dir}/articles.json", 'w') as f:
-            json.dump({'articles': articles}, f, indent=2)
+        self.write_json(f"{output_dir}/articles.json", {'articles': articles})
         print(f"  ✓ Saved {len(articles)} articles")
 
         # Save KPIs
-        with open(f"{output_dir}/kpis.json", 'w') as f:
-            json.dump({'kpis': kpis}, f, indent=2)
+        self.write_json(f"{output_dir}/kpis.json", {'kpis': kpis})
         print(f"  ✓ Saved {len(kpis)} KPIs")
 
         # Save trends
-        with open(f"{output_dir}/trends.json", 'w') as f:
-            json.dump(trends, f, indent=2)
+        self.write_json(f"{output_dir}/trends.json", trends)
         print(f"  ✓ Saved trend data")
 
         # Save insights and alerts
-        with open(f"{output_dir}/insights.json", 'w') as f:
-            json.dump({'insights': insights, 'alerts': alerts}, f, indent=2)
+        self.write_json(f"{output_dir}/insights.json", {'insights': insights, 'alerts': alerts})
         print(f"  ✓ Saved {len(insights)} insights and {len(alerts)} alerts")
 
         print("\n✅ All data saved successfully!\n")
@@ -656,31 +846,42 @@ class ArticleProcessor:
 
 def main():
     """Main execution pipeline"""
+    parser = argparse.ArgumentParser(description="Process newspaper articles into dashboard data")
+    parser.add_argument(
+        "--high-accuracy",
+        action="store_true",
+        help=f"Use the {HIGH_ACCURACY_SEMANTIC_MODEL} transformer instead of static embeddings for KPI mapping"
+    )
+    args = parser.parse_args()
+
     print("\n" + "="*60)
     print("PM OFFICE INTELLIGENCE DASHBOARD - ARTICLE PROCESSOR")
     print("="*60 + "\n")
 
     # Initialize processor
-    processor = ArticleProcessor()
+    processor = ArticleProcessor(high_accuracy=args.high_accuracy)
 
     # Load CSV files
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'postprocessed')
     df = processor.load_csv_files(data_dir)
 
     # Process articles
-    articles = processor.process_articles(df)
+    articles, article_embeddings = processor.process_articles(df)
+
+    # Topic clustering (reuses the summary embeddings from processing)
+    articles = processor.perform_topic_clustering(articles, article_embeddings)
 
-    # Topic clustering
-    articles = processor.perform_topic_clustering(articles)
+    # Per-article arrays and date groups shared by the steps below
+    article_index = processor.index_articles(articles)
 
     # Generate KPIs
-    kpis = processor.generate_kpis(articles)
+    kpis = processor.generate_kpis(article_index)
 
     # Generate trends
-    trends = processor.generate_trends(articles)
+    trends = processor.generate_trends(article_index)
 
     # Detect anomalies
-    alerts = processor.detect_anomalies(articles, kpis)
+    alerts = processor.detect_anomalies(article_index, kpis)
 
     # Generate insights
     insights = processor.generate_insights(articles, kpis, alerts)